@@ -4,22 +4,37 @@ MCP Server Runner for AWS Lambda
 This script adapts the MCP server to run in AWS Lambda environment
 """
 
-import json
 import asyncio
+import orjson
+import msgspec
 import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
 import uuid
-from datetime import datetime
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from datetime import datetime, timezone
 import logging
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple, Union
 
 # Set up logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Initialize AWS services
-dynamodb = boto3.resource('dynamodb')
-conversations_table = dynamodb.Table('MCPConversations')
-bedrock_runtime = boto3.client('bedrock-runtime')
+# Initialize AWS services (module scope so warm invocations reuse pooled connections)
+aws_config = Config(
+    tcp_keepalive=True,
+    max_pool_connections=50,
+    retries={'mode': 'adaptive', 'max_attempts': 3}
+)
+bedrock_runtime = boto3.client('bedrock-runtime', config=aws_config)
+
+# The DynamoDB resource layer is slow to load, so defer it until a request needs it
+@lru_cache(maxsize=1)
+def get_conversations_table():
+    """Get the DynamoDB conversations table"""
+    return boto3.resource('dynamodb', config=aws_config).Table(CONVERSATIONS_TABLE)
 
 # MCP Protocol Constants
 MCP_VERSION = "1.0.0"
@@ -30,54 +45,189 @@ import os
 DEFAULT_MODEL = "amazon.nova-lite-v1:0"
 BEDROCK_MODEL_ID = os.environ.get('BEDROCK_MODEL_ID_ARN', DEFAULT_MODEL)
 
+# One item per conversation, holding its turns as a list
+CONVERSATIONS_TABLE = os.environ.get('CONVERSATIONS_TABLE', 'MCPConversationSessions')
+
+# Pre-encoded Nova request body; only the user message text varies per call
+BEDROCK_BODY_TEMPLATE = b'{"inferenceConfig":{"max_new_tokens":500},"messages":[{"role":"user","content":[{"text":%s}]}]}'
+
+# Number of past exchanges included in the model context
+HISTORY_WINDOW = 10
+
+# Oldest turns are dropped beyond either limit; the byte budget leaves headroom under DynamoDB's
+# 400 KB item limit for attribute names and the other attributes
+MAX_STORED_TURNS = 100
+MAX_STORED_BYTES = 350 * 1024
+
+# In-process cache of conversation history, reused across warm invocations
+# conversation_id -> (cached_at, turns, turn_count), least recently used first
+HISTORY_CACHE_TTL = 60
+HISTORY_CACHE_SIZE = 512
+_history_cache = OrderedDict()
+
+# Event loop kept across warm invocations instead of creating one per request
+event_loop = asyncio.new_event_loop()
+asyncio.set_event_loop(event_loop)
+
+# Background tasks (e.g. conversation writes) awaited before the invocation returns
+_pending_tasks = set()
+
+def _turn_size(turn: Dict) -> int:
+    """Approximate stored size of a turn: attribute names plus UTF-8 values, with map overhead"""
+    return sum(len(k) + len(str(v).encode()) for k, v in turn.items()) + 16
+
+def _dumps(obj) -> str:
+    """Serialize to a compact JSON string with orjson"""
+    return orjson.dumps(obj).decode()
+
+def _split_response(result: Dict) -> tuple:
+    """Pre-serialize a JSON-RPC success response as the text before and after its id"""
+    return '{"jsonrpc":"2.0","id":', ',"result":' + _dumps(result) + '}'
+
+# Static MCP payloads, built once per execution environment (tuples: never mutated)
+SERVER_CAPABILITIES = {
+    "tools": {},
+    "resources": {},
+    "prompts": {},
+    "experimental": {
+        "sampling": True
+    }
+}
+
+TOOLS_LIST_RESULT = {"tools": (
+    {
+        "name": "chat_with_ai",
+        "description": f"Chat with {BEDROCK_MODEL_ID} AI assistant for customer support",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "message": {
+                    "type": "string",
+                    "description": "The user's message"
+                },
+                "conversation_id": {
+                    "type": "string",
+                    "description": "Conversation ID for context tracking"
+                },
+                "user_id": {
+                    "type": "string",
+                    "description": "User identifier"
+                }
+            },
+            "required": ["message"]
+        }
+    },
+    {
+        "name": "get_conversation_history",
+        "description": "Retrieve conversation history for a given conversation ID",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "conversation_id": {
+                    "type": "string",
+                    "description": "Conversation ID to retrieve history for"
+                }
+            },
+            "required": ["conversation_id"]
+        }
+    }
+)}
+
+RESOURCES_LIST_RESULT = {"resources": (
+    {
+        "uri": "conversation://history",
+        "name": "Conversation History",
+        "description": "Access to conversation history data",
+        "mimeType": "application/json"
+    },
+)}
+
+PROMPTS_LIST_RESULT = {"prompts": (
+    {
+        "name": "customer_support",
+        "description": "Customer support conversation prompt for Nova Lite",
+        "arguments": [
+            {
+                "name": "customer_issue",
+                "description": "Description of the customer's issue",
+                "required": True
+            },
+            {
+                "name": "urgency",
+                "description": "Urgency level (low, medium, high)",
+                "required": False
+            }
+        ]
+    },
+)}
+
+STATIC_RESPONSES = {
+    "tools/list": _split_response(TOOLS_LIST_RESULT),
+    "resources/list": _split_response(RESOURCES_LIST_RESULT),
+    "prompts/list": _split_response(PROMPTS_LIST_RESULT)
+}
+
+RESPONSE_HEADERS = {
+    "Content-Type": "application/json",
+    "Access-Control-Allow-Origin": "*"
+}
+
+class MCPRequest(msgspec.Struct):
+    """JSON-RPC request envelope"""
+    method: Optional[str] = None
+    params: Optional[Dict[str, Any]] = None
+    id: Union[str, int, float, None] = None
+
 class MCPLambdaHandler:
     """MCP Server adapted for AWS Lambda"""
     
     def __init__(self):
-        self.capabilities = {
-            "tools": {},
-            "resources": {},
-            "prompts": {},
-            "experimental": {
-                "sampling": True
-            }
+        # MCP method -> (handler taking params, whether the handler is a coroutine);
+        # the static listings are answered from STATIC_RESPONSES before routing
+        self.routes = {
+            "initialize": (self.handle_initialize, False),
+            "tools/call": (self.handle_tools_call, True),
+            "resources/read": (self.handle_resources_read, False),
+            "prompts/get": (self.handle_prompts_get, False),
+            "sampling/createMessage": (self.handle_sampling_create_message, True)
         }
     
     def lambda_handler(self, event, context):
         """AWS Lambda handler for MCP requests"""
         try:
             # Parse the MCP request
-            if 'body' in event:
-                body = json.loads(event['body'])
-            else:
-                body = event
+            try:
+                if 'body' in event:
+                    request = msgspec.json.decode(event['body'], type=MCPRequest)
+                else:
+                    request = msgspec.convert(event, MCPRequest)
+            except msgspec.ValidationError as e:
+                return self.create_client_error("invalid_request", f"Invalid request: {e}")
+            except msgspec.DecodeError as e:
+                return self.create_client_error("parse_error", f"Invalid JSON: {e}")
             
-            method = body.get("method")
-            params = body.get("params", {})
-            id_val = body.get("id")
+            method = request.method
+            params = request.params or {}
+            id_val = request.id
             
             logger.info(f"Processing MCP method: {method}")
             
+            # Static listings skip result building and serialization entirely
+            static_response = STATIC_RESPONSES.get(method)
+            if static_response is not None:
+                return {
+                    "statusCode": 200,
+                    "headers": RESPONSE_HEADERS,
+                    "body": static_response[0] + _dumps(id_val) + static_response[1]
+                }
+            
             # Route to appropriate handler
-            if method == "initialize":
-                result = self.handle_initialize(params)
-            elif method == "tools/list":
-                result = self.handle_tools_list()
-            elif method == "tools/call":
-                result = asyncio.run(self.handle_tools_call(params))
-            elif method == "resources/list":
-                result = self.handle_resources_list()
-            elif method == "resources/read":
-                result = self.handle_resources_read(params)
-            elif method == "prompts/list":
-                result = self.handle_prompts_list()
-            elif method == "prompts/get":
-                result = self.handle_prompts_get(params)
-            elif method == "sampling/createMessage":
-                result = asyncio.run(self.handle_sampling_create_message(params))
-            else:
+            handler, is_async = self.routes.get(method, (None, False))
+            if handler is None:
                 return self.create_error_response("method_not_found", f"Unknown method: {method}", id_val)
             
+            result = event_loop.run_until_complete(handler(params)) if is_async else handler(params)
+            
             # Create success response
             response = {
                 "jsonrpc": "2.0",
@@ -85,24 +235,24 @@ class MCPLambdaHandler:
                 "result": result
             }
             
+            response_body = _dumps(response)
+            
+            # Lambda freezes the environment once we return, so finish background writes first
+            if _pending_tasks:
+                event_loop.run_until_complete(self.wait_for_pending_tasks())
+            
             return {
                 "statusCode": 200,
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*"
-                },
-                "body": json.dumps(response)
+                "headers": RESPONSE_HEADERS,
+                "body": response_body
             }
             
         except Exception as e:
             logger.error(f"Error processing MCP request: {str(e)}")
             return {
                 "statusCode": 500,
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Allow-Origin": "*"
-                },
-                "body": json.dumps(self.create_error_response("internal_error", str(e), None))
+                "headers": RESPONSE_HEADERS,
+                "body": _dumps(self.create_error_response("internal_error", str(e), None))
             }
     
     def handle_initialize(self, params: Dict) -> Dict:
@@ -114,56 +264,13 @@ class MCPLambdaHandler:
         
         return {
             "protocolVersion": PROTOCOL_VERSION,
-            "capabilities": self.capabilities,
+            "capabilities": SERVER_CAPABILITIES,
             "serverInfo": {
                 "name": "AWS MCP Customer Support Server",
                 "version": MCP_VERSION
             }
         }
     
-    def handle_tools_list(self) -> Dict:
-        """Handle tools/list request"""
-        tools = [
-            {
-                "name": "chat_with_ai",
-                "description": f"Chat with {BEDROCK_MODEL_ID} AI assistant for customer support",
-                "inputSchema": {
-                    "type": "object",
-                    "properties": {
-                        "message": {
-                            "type": "string",
-                            "description": "The user's message"
-                        },
-                        "conversation_id": {
-                            "type": "string",
-                            "description": "Conversation ID for context tracking"
-                        },
-                        "user_id": {
-                            "type": "string",
-                            "description": "User identifier"
-                        }
-                    },
-                    "required": ["message"]
-                }
-            },
-            {
-                "name": "get_conversation_history",
-                "description": "Retrieve conversation history for a given conversation ID",
-                "inputSchema": {
-                    "type": "object",
-                    "properties": {
-                        "conversation_id": {
-                            "type": "string",
-                            "description": "Conversation ID to retrieve history for"
-                        }
-                    },
-                    "required": ["conversation_id"]
-                }
-            }
-        ]
-        
-        return {"tools": tools}
-    
     async def handle_tools_call(self, params: Dict) -> Dict:
         """Handle tools/call request"""
         tool_name = params.get("name")
@@ -180,7 +287,7 @@ class MCPLambdaHandler:
             "content": [
                 {
                     "type": "text",
-                    "text": json.dumps(result, indent=2)
+                    "text": _dumps(result)
                 }
             ]
         }
@@ -188,25 +295,28 @@ class MCPLambdaHandler:
     async def tool_chat_with_ai(self, arguments: Dict) -> Dict:
         """Tool: Chat with configured Bedrock AI model"""
         message = arguments.get("message", "")
-        conversation_id = arguments.get("conversation_id", str(uuid.uuid4()))
+        conversation_id = arguments.get("conversation_id") or uuid.uuid4().hex
         user_id = arguments.get("user_id", "anonymous")
         
-        # Get conversation history
-        conversation_history = await self.get_conversation_history_from_db(conversation_id)
+        # Get conversation history (only the newest MAX_STORED_TURNS are kept, so count turns separately)
+        conversation_history, turn_count = await self.load_conversation(conversation_id)
         
         # Generate response using Bedrock model
         response_text = await self.call_bedrock_model(message, conversation_history)
+        timestamp = datetime.now(timezone.utc).isoformat()
         
-        # Store conversation
-        await self.store_conversation(conversation_id, user_id, message, response_text)
+        # Store conversation in the background while the response is serialized
+        task = asyncio.create_task(self.store_conversation(conversation_id, user_id, message, response_text, timestamp))
+        _pending_tasks.add(task)
+        task.add_done_callback(_pending_tasks.discard)
         
         return {
             "conversation_id": conversation_id,
             "user_id": user_id,
             "response": response_text,
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": timestamp,
             "context": {
-                "conversation_length": len(conversation_history) + 1,
+                "conversation_length": turn_count + 1,
                 "model": BEDROCK_MODEL_ID
             }
         }
@@ -224,22 +334,9 @@ class MCPLambdaHandler:
             "conversation_id": conversation_id,
             "history": history,
             "total_exchanges": len(history),
-            "retrieved_at": datetime.utcnow().isoformat()
+            "retrieved_at": datetime.now(timezone.utc).isoformat()
         }
     
-    def handle_resources_list(self) -> Dict:
-        """Handle resources/list request"""
-        resources = [
-            {
-                "uri": "conversation://history",
-                "name": "Conversation History",
-                "description": "Access to conversation history data",
-                "mimeType": "application/json"
-            }
-        ]
-        
-        return {"resources": resources}
-    
     def handle_resources_read(self, params: Dict) -> Dict:
         """Handle resources/read request"""
         uri = params.get("uri")
@@ -260,34 +357,11 @@ class MCPLambdaHandler:
                 {
                     "uri": uri,
                     "mimeType": "application/json",
-                    "text": json.dumps(response_data, indent=2)
+                    "text": _dumps(response_data)
                 }
             ]
         }
     
-    def handle_prompts_list(self) -> Dict:
-        """Handle prompts/list request"""
-        prompts = [
-            {
-                "name": "customer_support",
-                "description": "Customer support conversation prompt for Nova Lite",
-                "arguments": [
-                    {
-                        "name": "customer_issue",
-                        "description": "Description of the customer's issue",
-                        "required": True
-                    },
-                    {
-                        "name": "urgency",
-                        "description": "Urgency level (low, medium, high)",
-                        "required": False
-                    }
-                ]
-            }
-        ]
-        
-        return {"prompts": prompts}
-    
     def handle_prompts_get(self, params: Dict) -> Dict:
         """Handle prompts/get request"""
         prompt_name = params.get("name")
@@ -326,19 +400,23 @@ Consider the urgency level in your response tone and suggested next steps."""
         max_tokens = params.get("maxTokens", 500)
         temperature = params.get("temperature", 0.7)
         
-        # Extract the last user message
+        # Extract the last user message, scanning backwards and stopping at the first match
         user_message = ""
-        for msg in reversed(messages):
-            if msg.get("role") == "user":
-                content = msg.get("content")
-                if isinstance(content, list):
-                    for item in content:
-                        if item.get("type") == "text":
-                            user_message = item.get("text", "")
-                            break
-                elif isinstance(content, str):
-                    user_message = content
+        for i in range(len(messages) - 1, -1, -1):
+            msg = messages[i]
+            if msg.get("role") != "user":
+                continue
+            content = msg.get("content")
+            if isinstance(content, str):
+                user_message = content
                 break
+            if isinstance(content, list):
+                for item in content:
+                    if item.get("type") == "text":
+                        user_message = item.get("text", "")
+                        break
+                if user_message:
+                    break
         
         if not user_message:
             raise ValueError("No user message found in sampling request")
@@ -370,53 +448,56 @@ Consider the urgency level in your response tone and suggested next steps."""
             #     "top_p": 0.9
             # }
 
-            max_tokens = 500
-            request_body = {
-                "inferenceConfig": {
-                    "max_new_tokens": max_tokens
-                },
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": [{
-                            "text": messages[-1]['content']
-                        }]
-                    }]
-            }
+            # orjson.dumps of a str yields a quoted, escaped JSON string to splice into the template
+            request_body = BEDROCK_BODY_TEMPLATE % orjson.dumps(messages[-1]['content'])
 
             logger.info(f"Calling Bedrock model: {BEDROCK_MODEL_ID}")
             
-            # Call Bedrock Runtime with configurable model
-            response = bedrock_runtime.invoke_model(
+            # Stream the generation from Bedrock (off the event loop) instead of waiting for a buffered body
+            response = await asyncio.to_thread(
+                bedrock_runtime.invoke_model_with_response_stream,
                 modelId=BEDROCK_MODEL_ID,
                 contentType="application/json",
                 accept="application/json",
-                body=json.dumps(request_body)
+                body=request_body
             )
+            response_text = await asyncio.to_thread(self.read_response_stream, response['body'])
             
-            # Parse the response
-            response_body = json.loads(response['body'].read())
-            
-            # Extract the generated text (format may vary by model)
-            if 'output' in response_body and 'message' in response_body['output']:
-                # Nova format
-                return response_body['output']['message']['content'][0]['text']
-            elif 'content' in response_body:
-                # Claude format
-                if isinstance(response_body['content'], list):
-                    return response_body['content'][0].get('text', '')
-                return str(response_body['content'])
-            elif 'completion' in response_body:
-                # Legacy format
-                return response_body['completion']
-            else:
-                logger.error(f"Unexpected response format from {BEDROCK_MODEL_ID}: {response_body}")
+            if not response_text:
+                logger.error(f"Unexpected response format from {BEDROCK_MODEL_ID}: no text in response stream")
                 return "I apologize, but I received an unexpected response format. Please try again."
+            
+            return response_text
                 
         except Exception as e:
             logger.error(f"Error calling Bedrock model {BEDROCK_MODEL_ID}: {str(e)}")
             return f"I apologize, but I encountered an error while processing your request: {str(e)}"
     
+    def read_response_stream(self, stream) -> str:
+        """Accumulate the generated text from a Bedrock response stream"""
+        pieces = []
+        for event in stream:
+            chunk = event.get('chunk')
+            if chunk:
+                pieces.append(self.extract_stream_text(orjson.loads(chunk['bytes'])))
+        return "".join(pieces)
+    
+    def extract_stream_text(self, chunk: Dict) -> str:
+        """Extract generated text from one streamed chunk (format may vary by model)"""
+        if 'contentBlockDelta' in chunk:
+            # Nova format
+            return chunk['contentBlockDelta']['delta'].get('text', '')
+        elif chunk.get('type') == 'content_block_delta':
+            # Claude format
+            return chunk['delta'].get('text', '')
+        elif 'completion' in chunk:
+            # Legacy format
+            return chunk['completion']
+        elif 'generation' in chunk:
+            # Llama format
+            return chunk['generation']
+        return ""
+    
     def build_conversation_context(self, current_message: str, conversation_history: List[Dict]) -> List[Dict]:
         """Build conversation context for Bedrock model"""
         messages = [{
@@ -424,10 +505,8 @@ Consider the urgency level in your response tone and suggested next steps."""
             "content": f"You are a helpful customer support assistant powered by {BEDROCK_MODEL_ID}. You provide accurate, helpful, and empathetic responses to customer inquiries. Use the conversation history to maintain context and provide personalized assistance."
         }]
         
-        # Add recent conversation history (limit to last 10 exchanges)
-        recent_history = conversation_history[-10:] if len(conversation_history) > 10 else conversation_history
-        
-        for item in recent_history:
+        # Add recent conversation history (last HISTORY_WINDOW exchanges)
+        for item in conversation_history[-HISTORY_WINDOW:]:
             messages.append({"role": "user", "content": item.get('query', '')})
             messages.append({"role": "assistant", "content": item.get('response', '')})
         
@@ -438,33 +517,120 @@ Consider the urgency level in your response tone and suggested next steps."""
     
     async def get_conversation_history_from_db(self, conversation_id: str) -> List[Dict]:
         """Retrieve conversation history from DynamoDB"""
+        turns, _ = await self.load_conversation(conversation_id)
+        return list(turns)
+    
+    async def load_conversation(self, conversation_id: str) -> Tuple[List[Dict], int]:
+        """Return the stored turns and the total number of turns ever stored for a conversation"""
+        cached = _history_cache.get(conversation_id)
+        if cached and time.time() - cached[0] < HISTORY_CACHE_TTL:
+            _history_cache.move_to_end(conversation_id)
+            return cached[1], cached[2]
+        
         try:
-            response = conversations_table.query(
-                KeyConditionExpression='conversation_id = :cid',
-                ExpressionAttributeValues={':cid': conversation_id},
-                ScanIndexForward=True
+            response = await asyncio.to_thread(
+                get_conversations_table().get_item,
+                Key={'conversation_id': conversation_id},
+                ProjectionExpression='turns, turn_count'
             )
-            return response.get('Items', [])
         except Exception as e:
             logger.error(f"Error retrieving conversation history: {str(e)}")
-            return []
+            return [], 0
+        
+        item = response.get('Item', {})
+        turns = item.get('turns', [])
+        turn_count = int(item.get('turn_count', len(turns)))
+        self._cache_conversation(conversation_id, turns, turn_count)
+        return turns, turn_count
+    
+    def _cache_conversation(self, conversation_id: str, turns: List[Dict], turn_count: int):
+        """Cache a conversation's turns, evicting the least recently used beyond HISTORY_CACHE_SIZE"""
+        _history_cache[conversation_id] = (time.time(), turns, turn_count)
+        _history_cache.move_to_end(conversation_id)
+        if len(_history_cache) > HISTORY_CACHE_SIZE:
+            _history_cache.popitem(last=False)
     
-    async def store_conversation(self, conversation_id: str, user_id: str, query: str, response: str):
-        """Store conversation turn in DynamoDB"""
+    async def store_conversation(self, conversation_id: str, user_id: str, query: str, response: str, timestamp: str):
+        """Append a conversation turn to the conversation's DynamoDB item"""
+        turn = {
+            'timestamp': timestamp,
+            'user_id': user_id,
+            'query': query,
+            'response': response
+        }
+        
         try:
-            conversations_table.put_item(
-                Item={
-                    'conversation_id': conversation_id,
-                    'timestamp': datetime.utcnow().isoformat(),
-                    'user_id': user_id,
-                    'query': query,
-                    'response': response,
-                    'turn_id': str(uuid.uuid4())
-                }
-            )
+            table = get_conversations_table()
+            try:
+                result = await self._append_turn(table, conversation_id, turn, timestamp)
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ValidationException':
+                    raise
+                # The item would pass 400 KB: make room for the turn in the stored list and retry once
+                response = await asyncio.to_thread(
+                    table.get_item,
+                    Key={'conversation_id': conversation_id},
+                    ProjectionExpression='turns',
+                    ConsistentRead=True
+                )
+                await self._trim_turns(table, conversation_id, response.get('Item', {}).get('turns', []), _turn_size(turn))
+                result = await self._append_turn(table, conversation_id, turn, timestamp)
+            
+            turns = result['Attributes']['turns']
+            await self._trim_turns(table, conversation_id, turns)
+            
+            # Refresh the cached history from the stored list instead of invalidating it
+            self._cache_conversation(conversation_id, turns, int(result['Attributes']['turn_count']))
         except Exception as e:
             logger.error(f"Error storing conversation: {str(e)}")
     
+    async def _append_turn(self, table, conversation_id: str, turn: Dict, timestamp: str) -> Dict:
+        """Append a turn and bump the turn counter; UPDATED_NEW returns the list including other environments' turns"""
+        return await asyncio.to_thread(
+            table.update_item,
+            Key={'conversation_id': conversation_id},
+            UpdateExpression='SET turns = list_append(if_not_exists(turns, :empty), :new), updated_at = :ts ADD turn_count :one',
+            ExpressionAttributeValues={':empty': [], ':new': [turn], ':ts': timestamp, ':one': 1},
+            ReturnValues='UPDATED_NEW'
+        )
+    
+    async def _trim_turns(self, table, conversation_id: str, turns: List[Dict], reserve: int = 0):
+        """Drop the oldest stored turns beyond MAX_STORED_TURNS or MAX_STORED_BYTES (less `reserve` bytes)"""
+        sizes = [_turn_size(t) for t in turns]
+        overflow = max(len(turns) - MAX_STORED_TURNS, 0)
+        size = reserve + sum(sizes[overflow:])
+        while overflow < len(turns) and size > MAX_STORED_BYTES:
+            size -= sizes[overflow]
+            overflow += 1
+        if not overflow:
+            return
+        
+        try:
+            # Only trim the list we measured; a concurrent writer that changed it trims for itself
+            await asyncio.to_thread(
+                table.update_item,
+                Key={'conversation_id': conversation_id},
+                UpdateExpression='REMOVE ' + ', '.join(f'turns[{i}]' for i in range(overflow)),
+                ConditionExpression='size(turns) = :len',
+                ExpressionAttributeValues={':len': len(turns)}
+            )
+            del turns[:overflow]
+        except table.meta.client.exceptions.ConditionalCheckFailedException:
+            pass
+    
+    async def wait_for_pending_tasks(self):
+        """Wait for background tasks started during this invocation"""
+        if _pending_tasks:
+            await asyncio.gather(*_pending_tasks)
+    
+    def create_client_error(self, error_code: str, message: str) -> Dict:
+        """Create an HTTP 400 response for a request that could not be parsed"""
+        return {
+            "statusCode": 400,
+            "headers": RESPONSE_HEADERS,
+            "body": _dumps(self.create_error_response(error_code, message, None))
+        }
+    
     def create_error_response(self, error_code: str, message: str, id_val: Optional[str] = None) -> Dict:
         """Create MCP error response"""
         error_response = {
@@ -491,6 +657,18 @@ Consider the urgency level in your response tone and suggested next steps."""
         }
         return error_codes.get(error_type, -32603)
 
+def prime_connections():
+    """Load the DynamoDB resource and open its connection during environment initialization"""
+    try:
+        get_conversations_table().get_item(Key={'conversation_id': '__warmup__'})
+    except Exception as e:
+        logger.warning(f"Connection priming failed: {str(e)}")
+
+# Pre-initialized environments (provisioned concurrency, SnapStart) pay init cost before any request,
+# so do the first-request work there; on-demand cold starts keep the lazy path
+if os.environ.get('AWS_LAMBDA_INITIALIZATION_TYPE') in ('provisioned-concurrency', 'snap-start'):
+    prime_connections()
+
 # Global handler instance
 mcp_handler = MCPLambdaHandler()
 
@@ -1,6 +1,7 @@
 import asyncio
 import websockets
-import json
+import orjson
+import weakref
 import uuid
 from typing import Dict, Any
 
@@ -9,13 +10,24 @@ class MCPClient:
         self.server_uri = server_uri
         self.websocket = None
         self.request_id = 0
-        self.pending_requests = {}
+        # Futures are owned by their waiting send_request call; entries vanish with them
+        self.pending_requests = weakref.WeakValueDictionary()
+        self.send_queue = None
+        self.writer_task = None
+        # Why the connection ended, raised by later sends instead of waiting out their timeout
+        self.connection_error = None
         
     async def connect(self):
         """Connect to MCP server"""
         self.websocket = await websockets.connect(self.server_uri)
         print(f"Connected to MCP server at {self.server_uri}")
         
+        self.connection_error = None
+        
+        # Start the single writer that owns the send side of the socket
+        self.send_queue = asyncio.Queue()
+        self.writer_task = asyncio.create_task(self.write_frames())
+        
         # Start listening for responses
         asyncio.create_task(self.listen_for_responses())
         
@@ -24,6 +36,8 @@ class MCPClient:
     
     async def disconnect(self):
         """Disconnect from MCP server"""
+        if self.writer_task:
+            self.writer_task.cancel()
         if self.websocket:
             await self.websocket.close()
             print("Disconnected from MCP server")
@@ -32,26 +46,65 @@ class MCPClient:
         """Listen for responses from the server"""
         try:
             async for message in self.websocket:
-                response = json.loads(message)
+                response = orjson.loads(message)
                 
                 if "id" in response:
                     # This is a response to a request
-                    request_id = response["id"]
-                    if request_id in self.pending_requests:
-                        future = self.pending_requests.pop(request_id)
+                    future = self.pending_requests.pop(response["id"], None)
+                    if future is not None and not future.done():
                         future.set_result(response)
                 else:
                     # This is a notification
                     print(f"Received notification: {response}")
-        except websockets.exceptions.ConnectionClosed:
+            
+            # Newer websockets versions end the iteration on a clean close instead of raising
+            print("Connection to server closed")
+            self.fail_pending_requests(ConnectionError("Connection to MCP server closed"))
+        except websockets.exceptions.ConnectionClosed as e:
             print("Connection to server closed")
+            self.fail_pending_requests(e)
         except Exception as e:
             print(f"Error listening for responses: {e}")
+            self.fail_pending_requests(e)
+    
+    async def write_frames(self):
+        """Send queued frames, draining everything already queued per wake-up"""
+        try:
+            while True:
+                frames = [await self.send_queue.get()]
+                while not self.send_queue.empty():
+                    frames.append(self.send_queue.get_nowait())
+                
+                # Each frame stays its own message: send(iterable) would fragment them into one
+                for frame in frames:
+                    await self.websocket.send(frame)
+        except websockets.exceptions.ConnectionClosed as e:
+            self.fail_pending_requests(e)
+        except Exception as e:
+            print(f"Error sending to server: {e}")
+            self.fail_pending_requests(e)
+            await self.websocket.close()
+    
+    def fail_pending_requests(self, error: Exception):
+        """Fail every request still waiting for a response, and any sent later"""
+        if self.connection_error is None:
+            self.connection_error = error
+        for future in list(self.pending_requests.values()):
+            if not future.done():
+                future.set_exception(error)
+    
+    def check_connection(self):
+        """Raise at once if the connection is gone, rather than queueing a frame nobody will send"""
+        if self.connection_error is not None:
+            raise self.connection_error
+        if self.writer_task is None or self.writer_task.done():
+            raise ConnectionError("Not connected to MCP server")
     
     async def send_request(self, method: str, params: Dict = None) -> Dict:
         """Send a request to the MCP server"""
-        self.request_id += 1
-        request_id = str(self.request_id)
+        self.check_connection()
+        request_id = self.request_id + 1
+        self.request_id = request_id
         
         request = {
             "jsonrpc": "2.0",
@@ -61,30 +114,31 @@ class MCPClient:
         }
         
         # Create future for response
-        future = asyncio.Future()
+        future = asyncio.get_running_loop().create_future()
         self.pending_requests[request_id] = future
         
-        # Send request
-        await self.websocket.send(json.dumps(request))
-        
         # Wait for response
         try:
-            response = await asyncio.wait_for(future, timeout=30.0)
+            # Queue request for the writer
+            await self.send_queue.put(orjson.dumps(request).decode())
+            
+            response = await asyncio.wait_for(asyncio.shield(future), timeout=30.0)
             return response
         except asyncio.TimeoutError:
-            if request_id in self.pending_requests:
-                del self.pending_requests[request_id]
             raise Exception(f"Request {method} timed out")
+        finally:
+            self.pending_requests.pop(request_id, None)
     
     async def send_notification(self, method: str, params: Dict = None):
         """Send a notification to the MCP server"""
+        self.check_connection()
         notification = {
             "jsonrpc": "2.0",
             "method": method,
             "params": params or {}
         }
         
-        await self.websocket.send(json.dumps(notification))
+        await self.send_queue.put(orjson.dumps(notification).decode())
     
     async def initialize(self):
         """Initialize the MCP connection"""
@@ -149,7 +203,7 @@ class MCPClient:
         # Extract the actual response from the tool result
         content = result.get("content", [])
         if content and len(content) > 0:
-            response_data = json.loads(content[0]["text"])
+            response_data = orjson.loads(content[0]["text"])
             return response_data
         
         return result
@@ -165,7 +219,7 @@ class MCPClient:
         # Extract the actual response from the tool result
         content = result.get("content", [])
         if content and len(content) > 0:
-            response_data = json.loads(content[0]["text"])
+            response_data = orjson.loads(content[0]["text"])
             return response_data
         
         return result
@@ -269,7 +323,7 @@ async def interactive_client():
                     print(f"Getting history for conversation: {conv_id}")
                     
                     result = await client.get_conversation_history(conv_id)
-                    print(f"History: {json.dumps(result, indent=2)}")
+                    print(f"History: {orjson.dumps(result, option=orjson.OPT_INDENT_2).decode()}")
                     print()
                 
                 elif command == "tools":
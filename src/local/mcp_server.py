@@ -1,34 +1,116 @@
-import json
 import asyncio
+import os
+import orjson
 import websockets
-import boto3
-import uuid
-from datetime import datetime
+import aioboto3
+from aiobotocore.config import AioConfig
+from boto3.dynamodb.types import TypeSerializer, TypeDeserializer
+from contextlib import AsyncExitStack, suppress
+from collections import OrderedDict
+from decimal import Decimal
+from types import MappingProxyType
+try:
+    import uvloop
+except ImportError:  # uvloop is not available on Windows
+    uvloop = None
+import secrets
+import time
 import logging
 from typing import Dict, Any, Optional, List
-import traceback
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize AWS services
-dynamodb = boto3.resource('dynamodb')
-conversations_table = dynamodb.Table('MCPConversations')
-bedrock_runtime = boto3.client('bedrock-runtime')
+# Initialize AWS services (async clients are opened once at server startup)
+aws_session = aioboto3.Session()
+aws_config = AioConfig(
+    max_pool_connections=50,
+    connect_timeout=5,
+    read_timeout=30,
+    retries={'max_attempts': 3, 'mode': 'adaptive'}
+)
+
+# Low-level DynamoDB client plus shared (de)serializers instead of the resource layer
+CONVERSATIONS_TABLE = 'MCPConversations'
+type_serializer = TypeSerializer()
+type_deserializer = TypeDeserializer()
+
+class ThreadedClient:
+    """Expose a blocking AWS client's operations as coroutines run in worker threads"""
+    
+    def __init__(self, client):
+        self._client = client
+    
+    def __getattr__(self, name):
+        operation = getattr(self._client, name)
+        
+        async def call(**kwargs):
+            return await asyncio.to_thread(operation, **kwargs)
+        
+        return call
 
 # Get model configuration from environment variables
-import os
 DEFAULT_MODEL = "amazon.nova-lite-v1:0"
 BEDROCK_MODEL_ID = os.environ.get('BEDROCK_MODEL_ID', DEFAULT_MODEL)
 
+# Optional DynamoDB Accelerator (DAX) cluster, e.g. dax://my-cluster.abc123.dax-clusters.us-east-1.amazonaws.com
+DAX_ENDPOINT = os.environ.get('DAX_ENDPOINT')
+
+# customer_support prompt, with the model ID interpolated once at import
+CS_PROMPT_DESCRIPTION = "Customer support prompt for Nova Lite"
+CS_PROMPT_PREFIX = f"You are a helpful customer support assistant powered by {BEDROCK_MODEL_ID}.\n\nCustomer Issue: "
+CS_PROMPT_SUFFIX = """
+Urgency Level: {}
+
+Please provide a helpful, empathetic, and professional response to address the customer's concern. 
+Consider the urgency level in your response tone and suggested next steps."""
+
 # MCP Protocol Constants
 MCP_VERSION = "1.0.0"
 PROTOCOL_VERSION = "2024-11-05"
 
+# JSON-RPC error codes for MCP errors
+ERROR_CODES = {
+    "parse_error": -32700,
+    "invalid_request": -32600,
+    "method_not_found": -32601,
+    "invalid_params": -32602,
+    "internal_error": -32603
+}
+
+# Shared read-only params for requests that omit them (avoids a new dict per frame)
+EMPTY_PARAMS = MappingProxyType({})
+
+# Number of past exchanges included in the model context
+HISTORY_WINDOW = 10
+
+# Maximum number of conversations kept in the in-process history and context caches
+HISTORY_CACHE_SIZE = 1024
+
+# Conversation turns are written with BatchWriteItem: at most 25 items per request,
+# collected for up to 50 ms after the first queued turn
+WRITE_BATCH_SIZE = 25
+WRITE_BATCH_WINDOW = 0.05
+WRITE_MAX_RETRIES = 5
+
+def _json_default(obj):
+    """Serialize DynamoDB numbers (Decimal), e.g. turn_number in stored history"""
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    raise TypeError
+
+def _new_id() -> str:
+    """Random 128-bit identifier as 32 hex characters"""
+    return secrets.token_hex(16)
+
+def _utcnow_iso() -> str:
+    """Current UTC time in ISO 8601 format, without building a datetime object"""
+    seconds, micros = divmod(time.time_ns() // 1000, 1_000_000)
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(seconds)) + f".{micros:06d}"
+
 class MCPServer:
     def __init__(self):
-        self.clients = set()
         self.capabilities = {
             "tools": {},
             "resources": {},
@@ -37,90 +119,27 @@ class MCPServer:
                 "sampling": True
             }
         }
+        self.dynamodb = None
+        self.bedrock_runtime = None
         
-    async def handle_client(self, websocket, path):
-        """Handle incoming MCP client connections"""
-        logger.info(f"New MCP client connected from {websocket.remote_address}")
-        self.clients.add(websocket)
+        # conversation_id -> history, least recently used first
+        self._history_cache: OrderedDict = OrderedDict()
+        # conversation_id -> query limit, for cached histories that hold only the most recent turns
+        self._history_limits: Dict[str, int] = {}
+        # Per-conversation locks so concurrent cold misses issue a single query
+        self._history_locks: Dict[str, asyncio.Lock] = {}
+        # conversation_id -> number of requests holding or waiting on its lock
+        self._history_lock_users: Dict[str, int] = {}
+        # conversation_id -> model context (system prompt + recent exchanges), least recently used first
+        self._context_cache: OrderedDict = OrderedDict()
+        # Conversation turns waiting to be flushed to DynamoDB
+        self._write_queue: asyncio.Queue = asyncio.Queue()
+        self._flush_task: Optional[asyncio.Task] = None
+        # conversation_id -> queued turns not yet written, merged into histories reloaded meanwhile
+        self._pending_turns: Dict[str, List[Dict]] = {}
         
-        try:
-            async for message in websocket:
-                try:
-                    await self.process_message(websocket, message)
-                except Exception as e:
-                    logger.error(f"Error processing message: {str(e)}")
-                    await self.send_error(websocket, "internal_error", str(e))
-        except websockets.exceptions.ConnectionClosed:
-            logger.info(f"Client {websocket.remote_address} disconnected")
-        finally:
-            self.clients.discard(websocket)
-    
-    async def process_message(self, websocket, message: str):
-        """Process incoming MCP messages"""
-        try:
-            data = json.loads(message)
-            method = data.get("method")
-            params = data.get("params", {})
-            id_val = data.get("id")
-            
-            logger.info(f"Processing MCP method: {method}")
-            
-            if method == "initialize":
-                await self.handle_initialize(websocket, params, id_val)
-            elif method == "notifications/initialized":
-                await self.handle_initialized(websocket)
-            elif method == "tools/list":
-                await self.handle_tools_list(websocket, id_val)
-            elif method == "tools/call":
-                await self.handle_tools_call(websocket, params, id_val)
-            elif method == "resources/list":
-                await self.handle_resources_list(websocket, id_val)
-            elif method == "resources/read":
-                await self.handle_resources_read(websocket, params, id_val)
-            elif method == "prompts/list":
-                await self.handle_prompts_list(websocket, id_val)
-            elif method == "prompts/get":
-                await self.handle_prompts_get(websocket, params, id_val)
-            elif method == "sampling/createMessage":
-                await self.handle_sampling_create_message(websocket, params, id_val)
-            else:
-                await self.send_error(websocket, "method_not_found", f"Unknown method: {method}", id_val)
-                
-        except json.JSONDecodeError:
-            await self.send_error(websocket, "parse_error", "Invalid JSON")
-        except Exception as e:
-            logger.error(f"Error in process_message: {str(e)}")
-            await self.send_error(websocket, "internal_error", str(e))
-    
-    async def handle_initialize(self, websocket, params: Dict, id_val: str):
-        """Handle MCP initialize request"""
-        client_info = params.get("clientInfo", {})
-        protocol_version = params.get("protocolVersion", "")
-        
-        logger.info(f"Initialize request from {client_info.get('name', 'unknown')} v{client_info.get('version', 'unknown')}")
-        
-        response = {
-            "jsonrpc": "2.0",
-            "id": id_val,
-            "result": {
-                "protocolVersion": PROTOCOL_VERSION,
-                "capabilities": self.capabilities,
-                "serverInfo": {
-                    "name": "AWS MCP Customer Support Server",
-                    "version": MCP_VERSION
-                }
-            }
-        }
-        
-        await websocket.send(json.dumps(response))
-    
-    async def handle_initialized(self, websocket):
-        """Handle MCP initialized notification"""
-        logger.info("Client initialization completed")
-    
-    async def handle_tools_list(self, websocket, id_val: str):
-        """Handle tools/list request"""
-        tools = [
+        # Static payloads, built and serialized once for the lifetime of the server
+        self._tools_payload = {"tools": [
             {
                 "name": "chat_with_ai",
                 "description": f"Chat with {BEDROCK_MODEL_ID} AI assistant for customer support",
@@ -157,19 +176,192 @@ class MCPServer:
                     "required": ["conversation_id"]
                 }
             }
-        ]
+        ]}
         
-        response = {
-            "jsonrpc": "2.0",
-            "id": id_val,
-            "result": {
-                "tools": tools
+        self._resources_payload = {"resources": [
+            {
+                "uri": "conversation://history",
+                "name": "Conversation History",
+                "description": "Access to conversation history data",
+                "mimeType": "application/json"
+            }
+        ]}
+        
+        self._prompts_payload = {"prompts": [
+            {
+                "name": "customer_support",
+                "description": "Customer support conversation prompt for Nova Lite",
+                "arguments": [
+                    {
+                        "name": "customer_issue",
+                        "description": "Description of the customer's issue",
+                        "required": True
+                    },
+                    {
+                        "name": "urgency",
+                        "description": "Urgency level (low, medium, high)",
+                        "required": False
+                    }
+                ]
+            }
+        ]}
+        
+        self._initialize_result = {
+            "protocolVersion": PROTOCOL_VERSION,
+            "capabilities": self.capabilities,
+            "serverInfo": {
+                "name": "AWS MCP Customer Support Server",
+                "version": MCP_VERSION
             }
         }
         
-        await websocket.send(json.dumps(response))
+        self._initialize_response = self._split_response(self._initialize_result)
+        self._tools_response = self._split_response(self._tools_payload)
+        self._resources_response = self._split_response(self._resources_payload)
+        self._prompts_response = self._split_response(self._prompts_payload)
+        
+        # MCP method -> handler(outbox, params, id_val)
+        self._dispatch = {
+            "initialize": self.handle_initialize,
+            "notifications/initialized": self.handle_initialized,
+            "tools/list": self.handle_tools_list,
+            "tools/call": self.handle_tools_call,
+            "resources/list": self.handle_resources_list,
+            "resources/read": self.handle_resources_read,
+            "prompts/list": self.handle_prompts_list,
+            "prompts/get": self.handle_prompts_get,
+            "sampling/createMessage": self.handle_sampling_create_message
+        }
+    
+    async def open_aws_clients(self, stack: AsyncExitStack):
+        """Open the async DynamoDB and Bedrock clients for the lifetime of the server"""
+        if DAX_ENDPOINT:
+            # DAX speaks the same low-level API; its client is blocking. Writes go through to DynamoDB,
+            # but DAX's query cache is not updated by them, so Query results may lag by the cluster's
+            # query TTL (5 minutes by default)
+            import amazondax
+            dax = amazondax.AmazonDaxClient(endpoint_url=DAX_ENDPOINT)
+            stack.callback(dax.close)
+            self.dynamodb = ThreadedClient(dax)
+            logger.info("Using DAX endpoint %s for conversation storage", DAX_ENDPOINT)
+        else:
+            self.dynamodb = await stack.enter_async_context(aws_session.client('dynamodb', config=aws_config))
+        self.bedrock_runtime = await stack.enter_async_context(
+            aws_session.client('bedrock-runtime', config=aws_config)
+        )
+    
+    async def start_write_flusher(self, stack: AsyncExitStack):
+        """Start the background task that batches conversation writes; pending turns are flushed on exit"""
+        self._flush_task = asyncio.create_task(self._flush_writes())
+        stack.push_async_callback(self.stop_write_flusher)
+    
+    async def stop_write_flusher(self):
+        """Wait for queued conversation turns to be written, then stop the flush task"""
+        await self._write_queue.join()
+        self._flush_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._flush_task
+        
+    @staticmethod
+    def _encode(obj) -> str:
+        """Serialize a message to a compact JSON string (sent as a text frame)"""
+        return orjson.dumps(obj, default=_json_default).decode()
+    
+    @staticmethod
+    def _decode(message):
+        """Parse an incoming JSON message (text or binary frame)"""
+        return orjson.loads(message)
+    
+    @classmethod
+    def _split_response(cls, result: Dict) -> tuple:
+        """Pre-serialize a JSON-RPC success response as the text before and after its id"""
+        return '{"jsonrpc":"2.0","id":', ',"result":' + cls._encode(result) + '}'
+    
+    def _with_id(self, split_response: tuple, id_val) -> str:
+        """Complete a pre-serialized response with the request id"""
+        return split_response[0] + self._encode(id_val) + split_response[1]
+    
+    async def handle_client(self, websocket, path: Optional[str] = None):
+        """Handle incoming MCP client connections"""
+        logger.info("New MCP client connected from %s", websocket.remote_address)
+        
+        # Handlers queue responses; a single writer task owns the socket's send side
+        outbox: asyncio.Queue = asyncio.Queue(maxsize=256)
+        writer = asyncio.create_task(self._write_responses(websocket, outbox))
+        
+        try:
+            async for message in websocket:
+                try:
+                    await self.process_message(outbox, message)
+                except Exception as e:
+                    logger.error("Error processing message: %s", e)
+                    await self.send_error(outbox, "internal_error", str(e))
+        except websockets.exceptions.ConnectionClosed:
+            logger.info("Client %s disconnected", websocket.remote_address)
+        finally:
+            writer.cancel()
+    
+    async def _write_responses(self, websocket, outbox: asyncio.Queue):
+        """Send queued responses to one client, draining everything already queued per wake-up"""
+        try:
+            while True:
+                frames = [await outbox.get()]
+                while not outbox.empty():
+                    frames.append(outbox.get_nowait())
+                
+                # Sent back-to-back in one pass; each frame stays its own JSON-RPC message
+                for frame in frames:
+                    await websocket.send(frame)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        except Exception as e:
+            logger.error("Error sending to client %s: %s", websocket.remote_address, e)
+            await websocket.close(code=1011, reason="internal error")
+            # Keep draining so handlers never block on a full outbox; cancelled once handle_client exits
+            while True:
+                await outbox.get()
+    
+    async def process_message(self, outbox, message: str):
+        """Process incoming MCP messages"""
+        try:
+            data = self._decode(message)
+            method = data.get("method")
+            params = data.get("params", EMPTY_PARAMS)
+            id_val = data.get("id")
+            
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Processing MCP method: %s", method)
+            
+            handler = self._dispatch.get(method)
+            if handler is None:
+                await self.send_error(outbox, "method_not_found", f"Unknown method: {method}", id_val)
+            else:
+                await handler(outbox, params, id_val)
+                
+        except orjson.JSONDecodeError:
+            await self.send_error(outbox, "parse_error", "Invalid JSON")
+        except Exception as e:
+            logger.error("Error in process_message: %s", e)
+            await self.send_error(outbox, "internal_error", str(e))
+    
+    async def handle_initialize(self, outbox, params: Dict, id_val: str):
+        """Handle MCP initialize request"""
+        client_info = params.get("clientInfo", {})
+        protocol_version = params.get("protocolVersion", "")
+        
+        logger.info("Initialize request from %s v%s", client_info.get('name', 'unknown'), client_info.get('version', 'unknown'))
+        
+        await outbox.put(self._with_id(self._initialize_response, id_val))
+    
+    async def handle_initialized(self, outbox, params: Dict, id_val: str):
+        """Handle MCP initialized notification"""
+        logger.info("Client initialization completed")
+    
+    async def handle_tools_list(self, outbox, params: Dict, id_val: str):
+        """Handle tools/list request"""
+        await outbox.put(self._with_id(self._tools_response, id_val))
     
-    async def handle_tools_call(self, websocket, params: Dict, id_val: str):
+    async def handle_tools_call(self, outbox, params: Dict, id_val: str):
         """Handle tools/call request"""
         tool_name = params.get("name")
         arguments = params.get("arguments", {})
@@ -180,7 +372,7 @@ class MCPServer:
             elif tool_name == "get_conversation_history":
                 result = await self.tool_get_conversation_history(arguments)
             else:
-                await self.send_error(websocket, "invalid_request", f"Unknown tool: {tool_name}", id_val)
+                await self.send_error(outbox, "invalid_request", f"Unknown tool: {tool_name}", id_val)
                 return
             
             response = {
@@ -190,40 +382,44 @@ class MCPServer:
                     "content": [
                         {
                             "type": "text",
-                            "text": json.dumps(result, indent=2)
+                            "text": self._encode(result)
                         }
                     ]
                 }
             }
             
-            await websocket.send(json.dumps(response))
+            await outbox.put(self._encode(response))
             
         except Exception as e:
-            logger.error(f"Error in tool call {tool_name}: {str(e)}")
-            await self.send_error(websocket, "internal_error", str(e), id_val)
+            logger.error("Error in tool call %s: %s", tool_name, e)
+            await self.send_error(outbox, "internal_error", str(e), id_val)
     
     async def tool_chat_with_ai(self, arguments: Dict) -> Dict:
         """Tool: Chat with configured Bedrock AI model"""
         message = arguments.get("message", "")
-        conversation_id = arguments.get("conversation_id", str(uuid.uuid4()))
+        conversation_id = arguments.get("conversation_id") or _new_id()
         user_id = arguments.get("user_id", "anonymous")
+        timestamp = _utcnow_iso()
         
         # Get conversation history
-        conversation_history = await self.get_conversation_history_from_db(conversation_id)
+        conversation_history = await self.get_conversation_history_from_db(conversation_id, limit=HISTORY_WINDOW)
+        conversation_length = self.conversation_length(conversation_id) + 1
         
         # Generate response using Bedrock model
-        response_text = await self.call_bedrock_model(message, conversation_history)
+        messages = self.build_conversation_context_incremental(conversation_id, message, conversation_history)
+        response_text = await self.call_bedrock_model(messages)
+        self.record_exchange(conversation_id, message, response_text)
         
         # Store conversation
-        await self.store_conversation(conversation_id, user_id, message, response_text)
+        await self.store_conversation(conversation_id, user_id, message, response_text, timestamp)
         
         return {
             "conversation_id": conversation_id,
             "user_id": user_id,
             "response": response_text,
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": timestamp,
             "context": {
-                "conversation_length": len(conversation_history) + 1,
+                "conversation_length": conversation_length,
                 "model": BEDROCK_MODEL_ID
             }
         }
@@ -235,37 +431,20 @@ class MCPServer:
         if not conversation_id:
             raise ValueError("conversation_id is required")
         
-        history = await self.get_conversation_history_from_db(conversation_id)
+        history = await self.get_conversation_history_from_db(conversation_id) or []
         
         return {
             "conversation_id": conversation_id,
             "history": history,
             "total_exchanges": len(history),
-            "retrieved_at": datetime.utcnow().isoformat()
+            "retrieved_at": _utcnow_iso()
         }
     
-    async def handle_resources_list(self, websocket, id_val: str):
+    async def handle_resources_list(self, outbox, params: Dict, id_val: str):
         """Handle resources/list request"""
-        resources = [
-            {
-                "uri": "conversation://history",
-                "name": "Conversation History",
-                "description": "Access to conversation history data",
-                "mimeType": "application/json"
-            }
-        ]
-        
-        response = {
-            "jsonrpc": "2.0",
-            "id": id_val,
-            "result": {
-                "resources": resources
-            }
-        }
-        
-        await websocket.send(json.dumps(response))
+        await outbox.put(self._with_id(self._resources_response, id_val))
     
-    async def handle_resources_read(self, websocket, params: Dict, id_val: str):
+    async def handle_resources_read(self, outbox, params: Dict, id_val: str):
         """Handle resources/read request"""
         uri = params.get("uri")
         
@@ -279,7 +458,7 @@ class MCPServer:
                 ]
             }
         else:
-            await self.send_error(websocket, "invalid_request", f"Unknown resource: {uri}", id_val)
+            await self.send_error(outbox, "invalid_request", f"Unknown resource: {uri}", id_val)
             return
         
         response = {
@@ -290,46 +469,19 @@ class MCPServer:
                     {
                         "uri": uri,
                         "mimeType": "application/json",
-                        "text": json.dumps(response_data, indent=2)
+                        "text": self._encode(response_data)
                     }
                 ]
             }
         }
         
-        await websocket.send(json.dumps(response))
+        await outbox.put(self._encode(response))
     
-    async def handle_prompts_list(self, websocket, id_val: str):
+    async def handle_prompts_list(self, outbox, params: Dict, id_val: str):
         """Handle prompts/list request"""
-        prompts = [
-            {
-                "name": "customer_support",
-                "description": "Customer support conversation prompt for Nova Lite",
-                "arguments": [
-                    {
-                        "name": "customer_issue",
-                        "description": "Description of the customer's issue",
-                        "required": True
-                    },
-                    {
-                        "name": "urgency",
-                        "description": "Urgency level (low, medium, high)",
-                        "required": False
-                    }
-                ]
-            }
-        ]
-        
-        response = {
-            "jsonrpc": "2.0",
-            "id": id_val,
-            "result": {
-                "prompts": prompts
-            }
-        }
-        
-        await websocket.send(json.dumps(response))
+        await outbox.put(self._with_id(self._prompts_response, id_val))
     
-    async def handle_prompts_get(self, websocket, params: Dict, id_val: str):
+    async def handle_prompts_get(self, outbox, params: Dict, id_val: str):
         """Handle prompts/get request"""
         prompt_name = params.get("name")
         arguments = params.get("arguments", {})
@@ -338,19 +490,13 @@ class MCPServer:
             customer_issue = arguments.get("customer_issue", "")
             urgency = arguments.get("urgency", "medium")
             
-            prompt_text = f"""You are a helpful customer support assistant powered by {BEDROCK_MODEL_ID}. 
-            
-Customer Issue: {customer_issue}
-Urgency Level: {urgency}
-
-Please provide a helpful, empathetic, and professional response to address the customer's concern. 
-Consider the urgency level in your response tone and suggested next steps."""
+            prompt_text = CS_PROMPT_PREFIX + str(customer_issue) + CS_PROMPT_SUFFIX.format(urgency)
 
             response = {
                 "jsonrpc": "2.0",
                 "id": id_val,
                 "result": {
-                    "description": "Customer support prompt for Nova Lite",
+                    "description": CS_PROMPT_DESCRIPTION,
                     "messages": [
                         {
                             "role": "user",
@@ -363,40 +509,38 @@ Consider the urgency level in your response tone and suggested next steps."""
                 }
             }
         else:
-            await self.send_error(websocket, "invalid_request", f"Unknown prompt: {prompt_name}", id_val)
+            await self.send_error(outbox, "invalid_request", f"Unknown prompt: {prompt_name}", id_val)
             return
         
-        await websocket.send(json.dumps(response))
+        await outbox.put(self._encode(response))
     
-    async def handle_sampling_create_message(self, websocket, params: Dict, id_val: str):
+    async def handle_sampling_create_message(self, outbox, params: Dict, id_val: str):
         """Handle sampling/createMessage request"""
         messages = params.get("messages", [])
         max_tokens = params.get("maxTokens", 500)
         temperature = params.get("temperature", 0.7)
         
         try:
-            # Extract the last user message
+            # Extract the last user message in a single backwards pass
             user_message = ""
             for msg in reversed(messages):
-                if msg.get("role") == "user":
-                    content = msg.get("content")
-                    if isinstance(content, list):
-                        for item in content:
-                            if item.get("type") == "text":
-                                user_message = item.get("text", "")
-                                break
-                    elif isinstance(content, str):
-                        user_message = content
+                get = msg.get
+                if get("role") != "user":
+                    continue
+                content = get("content")
+                if isinstance(content, str):
+                    user_message = content
                     break
+                if isinstance(content, list):
+                    user_message = next((item.get("text", "") for item in content if item.get("type") == "text"), "")
+                    if user_message:
+                        break
             
             if not user_message:
                 raise ValueError("No user message found in sampling request")
             
-            # Generate conversation ID for this sampling request
-            conversation_id = str(uuid.uuid4())
-            
             # Get response from Bedrock model
-            response_text = await self.call_bedrock_model(user_message, [])
+            response_text = await self.call_bedrock_model(self.build_conversation_context(user_message, []))
             
             response = {
                 "jsonrpc": "2.0",
@@ -412,18 +556,15 @@ Consider the urgency level in your response tone and suggested next steps."""
                 }
             }
             
-            await websocket.send(json.dumps(response))
+            await outbox.put(self._encode(response))
             
         except Exception as e:
-            logger.error(f"Error in sampling/createMessage: {str(e)}")
-            await self.send_error(websocket, "internal_error", str(e), id_val)
+            logger.error("Error in sampling/createMessage: %s", e)
+            await self.send_error(outbox, "internal_error", str(e), id_val)
     
-    async def call_bedrock_model(self, message: str, conversation_history: List[Dict]) -> str:
+    async def call_bedrock_model(self, messages: List[Dict]) -> str:
         """Call configured Bedrock model via AWS Bedrock"""
         try:
-            # Build conversation context
-            messages = self.build_conversation_context(message, conversation_history)
-            
             # Prepare the request body (format may vary by model)
             request_body = {
                 "messages": messages,
@@ -432,39 +573,49 @@ Consider the urgency level in your response tone and suggested next steps."""
                 "top_p": 0.9
             }
             
-            logger.info(f"Calling Bedrock model: {BEDROCK_MODEL_ID}")
+            logger.debug("Calling Bedrock model: %s", BEDROCK_MODEL_ID)
             
-            # Call Bedrock Runtime with configurable model
-            response = bedrock_runtime.invoke_model(
+            # Stream the generation so the event loop keeps serving other clients between chunks
+            response = await self.bedrock_runtime.invoke_model_with_response_stream(
                 modelId=BEDROCK_MODEL_ID,
                 contentType="application/json",
                 accept="application/json",
-                body=json.dumps(request_body)
+                body=orjson.dumps(request_body)
             )
             
-            # Parse the response
-            response_body = json.loads(response['body'].read())
+            pieces = []
+            async for event in response['body']:
+                chunk = event.get('chunk')
+                if chunk:
+                    pieces.append(self.extract_stream_text(orjson.loads(chunk['bytes'])))
+            response_text = "".join(pieces)
             
-            # Extract the generated text (format may vary by model)
-            if 'output' in response_body and 'message' in response_body['output']:
-                # Nova format
-                return response_body['output']['message']['content'][0]['text']
-            elif 'content' in response_body:
-                # Claude format
-                if isinstance(response_body['content'], list):
-                    return response_body['content'][0].get('text', '')
-                return str(response_body['content'])
-            elif 'completion' in response_body:
-                # Legacy format
-                return response_body['completion']
-            else:
-                logger.error(f"Unexpected response format from {BEDROCK_MODEL_ID}: {response_body}")
+            if not response_text:
+                logger.error("Unexpected response format from %s: no text in response stream", BEDROCK_MODEL_ID)
                 return "I apologize, but I received an unexpected response format. Please try again."
+            
+            return response_text
                 
         except Exception as e:
-            logger.error(f"Error calling Nova Lite: {str(e)}")
+            logger.error("Error calling Nova Lite: %s", e)
             return f"I apologize, but I encountered an error while processing your request: {str(e)}"
     
+    def extract_stream_text(self, chunk: Dict) -> str:
+        """Extract generated text from one streamed chunk (format may vary by model)"""
+        if 'contentBlockDelta' in chunk:
+            # Nova format
+            return chunk['contentBlockDelta']['delta'].get('text', '')
+        elif chunk.get('type') == 'content_block_delta':
+            # Claude format
+            return chunk['delta'].get('text', '')
+        elif 'completion' in chunk:
+            # Legacy format
+            return chunk['completion']
+        elif 'generation' in chunk:
+            # Llama format
+            return chunk['generation']
+        return ""
+    
     def build_conversation_context(self, current_message: str, conversation_history: List[Dict]) -> List[Dict]:
         """Build conversation context for Nova Lite"""
         messages = [{
@@ -472,8 +623,8 @@ Consider the urgency level in your response tone and suggested next steps."""
             "content": "You are a helpful customer support assistant powered by Amazon Nova Lite. You provide accurate, helpful, and empathetic responses to customer inquiries. Use the conversation history to maintain context and provide personalized assistance."
         }]
         
-        # Add recent conversation history (limit to last 10 exchanges)
-        recent_history = conversation_history[-10:] if len(conversation_history) > 10 else conversation_history
+        # Add recent conversation history (limit to last HISTORY_WINDOW exchanges)
+        recent_history = conversation_history[-HISTORY_WINDOW:]
         
         for item in recent_history:
             messages.append({"role": "user", "content": item.get('query', '')})
@@ -484,41 +635,217 @@ Consider the urgency level in your response tone and suggested next steps."""
         
         return messages
     
-    async def get_conversation_history_from_db(self, conversation_id: str) -> List[Dict]:
-        """Retrieve conversation history from DynamoDB"""
-        try:
-            response = conversations_table.query(
-                KeyConditionExpression='conversation_id = :cid',
-                ExpressionAttributeValues={':cid': conversation_id},
-                ScanIndexForward=True
-            )
-            return response.get('Items', [])
-        except Exception as e:
-            logger.error(f"Error retrieving conversation history: {str(e)}")
-            return []
+    def build_conversation_context_incremental(self, conversation_id: str, current_message: str,
+                                               conversation_history: Optional[List[Dict]]) -> List[Dict]:
+        """Build conversation context, reusing the context cached from earlier turns"""
+        context = self._context_cache.get(conversation_id)
+        if context is None and conversation_history is None:
+            # History failed to load; answer without it and don't cache the incomplete context
+            return self.build_conversation_context(current_message, [])
+        if context is None:
+            # Everything but the current message, which is added per turn below
+            context = self.build_conversation_context(current_message, conversation_history)[:-1]
+            self._context_cache[conversation_id] = context
+            if len(self._context_cache) > HISTORY_CACHE_SIZE:
+                self._context_cache.popitem(last=False)
+        else:
+            self._context_cache.move_to_end(conversation_id)
+        
+        return context + [{"role": "user", "content": current_message}]
     
-    async def store_conversation(self, conversation_id: str, user_id: str, query: str, response: str):
-        """Store conversation turn in DynamoDB"""
+    def record_exchange(self, conversation_id: str, query: str, response: str):
+        """Append a completed exchange to the cached context, keeping the last HISTORY_WINDOW exchanges"""
+        context = self._context_cache.get(conversation_id)
+        if context is not None:
+            context.append({"role": "user", "content": query})
+            context.append({"role": "assistant", "content": response})
+            # Index 0 is the system prompt
+            del context[1:-2 * HISTORY_WINDOW]
+    
+    def _cached_history(self, conversation_id: str, limit: Optional[int]) -> Optional[List[Dict]]:
+        """Return the cached history if it covers the last `limit` turns (all turns when None)"""
+        history = self._history_cache.get(conversation_id)
+        if history is None:
+            return None
+        
+        cached_limit = self._history_limits.get(conversation_id)
+        if cached_limit is not None and (limit is None or limit > cached_limit):
+            return None
+        
+        self._history_cache.move_to_end(conversation_id)
+        return history[-limit:] if limit else list(history)
+    
+    async def get_conversation_history_from_db(self, conversation_id: str, limit: Optional[int] = None) -> Optional[List[Dict]]:
+        """Retrieve the last `limit` turns of a conversation (all when None), or None if it could not be read"""
+        history = self._cached_history(conversation_id, limit)
+        if history is not None:
+            return history
+        
+        lock = self._history_locks.get(conversation_id)
+        if lock is None:
+            lock = self._history_locks[conversation_id] = asyncio.Lock()
+        self._history_lock_users[conversation_id] = self._history_lock_users.get(conversation_id, 0) + 1
         try:
-            conversations_table.put_item(
-                Item={
-                    'conversation_id': conversation_id,
-                    'timestamp': datetime.utcnow().isoformat(),
-                    'user_id': user_id,
-                    'query': query,
-                    'response': response,
-                    'turn_id': str(uuid.uuid4())
+            async with lock:
+                # Another request may have filled the cache while we waited
+                history = self._cached_history(conversation_id, limit)
+                if history is not None:
+                    return history
+                
+                query_args = {
+                    'TableName': CONVERSATIONS_TABLE,
+                    'KeyConditionExpression': 'conversation_id = :cid',
+                    'ExpressionAttributeValues': {':cid': type_serializer.serialize(conversation_id)},
+                    'ScanIndexForward': limit is None
                 }
-            )
+                if limit:
+                    # Read only the newest turns, then restore chronological order
+                    query_args['Limit'] = limit
+                elif DAX_ENDPOINT:
+                    # Strongly consistent queries bypass DAX's query cache, so full reloads see recent turns
+                    query_args['ConsistentRead'] = True
+                
+                response = await self.dynamodb.query(**query_args)
+                history = [
+                    {k: type_deserializer.deserialize(v) for k, v in item.items()}
+                    for item in response.get('Items', [])
+                ]
+                if limit:
+                    history.reverse()
+                
+                # Turns still waiting in the write queue are newer than anything the query returned
+                pending = self._pending_turns.get(conversation_id)
+                if pending:
+                    loaded = {item.get('turn_id') for item in history}
+                    history.extend(item for item in pending if item['turn_id'] not in loaded)
+                
+                # Without a LastEvaluatedKey the limited query returned every turn
+                if limit and 'LastEvaluatedKey' in response:
+                    self._history_limits[conversation_id] = limit
+                else:
+                    self._history_limits.pop(conversation_id, None)
+                
+                self._history_cache[conversation_id] = history
+                if len(self._history_cache) > HISTORY_CACHE_SIZE:
+                    evicted_id, _ = self._history_cache.popitem(last=False)
+                    self._history_limits.pop(evicted_id, None)
+                
+                return history[-limit:] if limit else list(history)
         except Exception as e:
-            logger.error(f"Error storing conversation: {str(e)}")
+            logger.error("Error retrieving conversation history: %s", e)
+            return None
+        finally:
+            # Keep the lock while others still wait on it, so they share the query that filled the cache
+            users = self._history_lock_users[conversation_id] - 1
+            if users:
+                self._history_lock_users[conversation_id] = users
+            else:
+                del self._history_lock_users[conversation_id]
+                del self._history_locks[conversation_id]
+    
+    def conversation_length(self, conversation_id: str) -> int:
+        """Number of turns in a conversation whose history has been loaded"""
+        history = self._history_cache.get(conversation_id)
+        if not history:
+            return 0
+        if conversation_id in self._history_limits:
+            # Only the newest turns are cached; each turn records its position in the conversation
+            # (turns stored before turn_number existed fall back to the window size)
+            turn_number = history[-1].get('turn_number')
+            if turn_number is not None:
+                return int(turn_number)
+        return len(history)
     
-    async def send_error(self, websocket, error_code: str, message: str, id_val: Optional[str] = None):
+    async def store_conversation(self, conversation_id: str, user_id: str, query: str, response: str,
+                                 timestamp: Optional[str] = None):
+        """Store conversation turn in DynamoDB"""
+        item = {
+            'conversation_id': conversation_id,
+            'timestamp': timestamp or _utcnow_iso(),
+            'user_id': user_id,
+            'query': query,
+            'response': response,
+            'turn_id': _new_id()
+        }
+        
+        # Number the turn when the conversation's history is loaded, so windowed reads know its length
+        history = self._history_cache.get(conversation_id)
+        if history is not None:
+            item['turn_number'] = self.conversation_length(conversation_id) + 1
+        
+        # Written by the flush task in a later batch
+        self._pending_turns.setdefault(conversation_id, []).append(item)
+        await self._write_queue.put(item)
+        
+        # Keep the cached history warm by appending rather than invalidating
+        if history is not None:
+            history.append(item)
+    
+    async def _flush_writes(self):
+        """Drain the write queue, sending up to WRITE_BATCH_SIZE turns per BatchWriteItem request"""
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self._write_queue.get()]
+            deadline = loop.time() + WRITE_BATCH_WINDOW
+            while len(items) < WRITE_BATCH_SIZE and loop.time() < deadline:
+                try:
+                    items.append(self._write_queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    await asyncio.sleep(0.005)
+            
+            try:
+                await self._batch_write(items)
+            except Exception as e:
+                # One invalid item (e.g. over 400 KB) fails the whole batch; write them one by one instead
+                logger.warning("Batch write of %d turns failed, retrying individually: %s", len(items), e)
+                await self._put_items(items)
+            finally:
+                for item in items:
+                    self._settle_pending(item)
+                    self._write_queue.task_done()
+    
+    def _settle_pending(self, item: Dict):
+        """Forget a queued turn once its write has finished"""
+        conversation_id = item['conversation_id']
+        pending = self._pending_turns[conversation_id]
+        pending.remove(item)
+        if not pending:
+            del self._pending_turns[conversation_id]
+    
+    async def _put_items(self, items: List[Dict]):
+        """Write conversation turns one PutItem at a time, so a bad item only loses itself"""
+        for item in items:
+            try:
+                await self.dynamodb.put_item(
+                    TableName=CONVERSATIONS_TABLE,
+                    Item={k: type_serializer.serialize(v) for k, v in item.items()}
+                )
+            except Exception as e:
+                logger.error("Error storing conversation: %s", e)
+    
+    async def _batch_write(self, items: List[Dict]):
+        """Write conversation turns with BatchWriteItem, retrying unprocessed items with backoff"""
+        request_items = {CONVERSATIONS_TABLE: [
+            {'PutRequest': {'Item': {k: type_serializer.serialize(v) for k, v in item.items()}}}
+            for item in items
+        ]}
+        
+        for attempt in range(WRITE_MAX_RETRIES):
+            response = await self.dynamodb.batch_write_item(RequestItems=request_items)
+            request_items = response.get('UnprocessedItems')
+            if not request_items:
+                return
+            await asyncio.sleep(WRITE_BATCH_WINDOW * 2 ** attempt)
+        
+        unprocessed = len(request_items.get(CONVERSATIONS_TABLE, []))
+        logger.error("Error storing conversation: %d turns still unprocessed after %d attempts", unprocessed, WRITE_MAX_RETRIES)
+    
+    async def send_error(self, outbox, error_code: str, message: str, id_val: Optional[str] = None):
         """Send MCP error response"""
         error_response = {
             "jsonrpc": "2.0",
             "error": {
-                "code": self.get_error_code(error_code),
+                "code": ERROR_CODES.get(error_code, -32603),
                 "message": message
             }
         }
@@ -526,18 +853,7 @@ Consider the urgency level in your response tone and suggested next steps."""
         if id_val is not None:
             error_response["id"] = id_val
         
-        await websocket.send(json.dumps(error_response))
-    
-    def get_error_code(self, error_type: str) -> int:
-        """Get numeric error codes for MCP errors"""
-        error_codes = {
-            "parse_error": -32700,
-            "invalid_request": -32600,
-            "method_not_found": -32601,
-            "invalid_params": -32602,
-            "internal_error": -32603
-        }
-        return error_codes.get(error_type, -32603)
+        await outbox.put(self._encode(error_response))
 
 async def main():
     """Start the MCP server"""
@@ -545,9 +861,25 @@ async def main():
     
     logger.info("Starting MCP Server on localhost:8765")
     
-    async with websockets.serve(server.handle_client, "localhost", 8765):
-        logger.info("MCP Server is running and waiting for connections...")
-        await asyncio.Future()  # run forever
+    async with AsyncExitStack() as stack:
+        await server.open_aws_clients(stack)
+        await server.start_write_flusher(stack)
+        
+        # Chosen values, not version-dependent defaults: permessage-deflate since model output is
+        # compressible text, a 1 MiB cap on incoming messages, and a 64 KiB write buffer so a
+        # multi-KB tool result is queued without waiting on the transport
+        async with websockets.serve(
+            server.handle_client, "localhost", 8765,
+            compression="deflate",
+            max_size=2**20,
+            write_limit=2**16
+        ):
+            logger.info("MCP Server is running and waiting for connections...")
+            await asyncio.Future()  # run forever
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if uvloop is not None:
+        # libuv-based event loop: faster socket I/O for the websocket read loop
+        uvloop.run(main())
+    else:
+        asyncio.run(main())